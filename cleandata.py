@@ -1,28 +1,171 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import os
+import io
 import re
-from urllib.parse import urlparse
+import csv
+import heapq
+import itertools
+import tempfile
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+
+# Splits a URL into its host and path in a single regex pass; like urlparse, the
+# scheme and host are optional, so scheme-relative and bare paths still get a path
+URL_PARTS_PATTERN = re.compile(r'^(?:[a-zA-Z][a-zA-Z0-9+\-.]*:)?(?://(?P<domain>[^/?#]*))?(?P<path>[^?#]*)')
+
+# Characters that aren't safe in filenames
+UNSAFE_FILENAME_PATTERN = re.compile(r'[^\w\-]')
 
 def clean_filename(url):
     """Convert URL to a clean filename"""
-    parsed = urlparse(url)
-    hostname = parsed.netloc
-    path = parsed.path.strip('/')
+    match = URL_PARTS_PATTERN.match(url)
+    hostname = match.group('domain') or ''
+    path = match.group('path').strip('/')
     
     if not path:
         return hostname.replace('.', '_')
     
     # Remove special characters and replace with underscores
-    filename = re.sub(r'[^\w\-]', '_', f"{hostname}_{path}")
+    filename = UNSAFE_FILENAME_PATTERN.sub('_', f"{hostname}_{path}")
     # Limit length to avoid very long filenames
     if len(filename) > 100:
         filename = filename[:100]
     return filename
 
+def clean_filenames(domains, paths):
+    """Vectorized clean_filename for whole domain and path columns"""
+    paths = paths.str.strip('/')
+    
+    # Remove special characters and limit length, as clean_filename does
+    filenames = (domains + '_' + paths).str.replace(UNSAFE_FILENAME_PATTERN, '_', regex=True).str.slice(0, 100)
+    
+    # Pages without a path are named after their hostname alone
+    return filenames.where(paths != '', domains.str.replace('.', '_', regex=False))
+
+# Organized CSV output options, shared by every run and the merged file so the
+# format doesn't depend on how many chunks the input had
+CSV_WRITE_OPTIONS = pacsv.WriteOptions(quoting_style='needed')
+
+# Number of merged rows converted to an Arrow batch at a time
+MERGE_BATCH_SIZE = 10_000
+
+# Number of page files handed to each write task
+PAGE_BATCH_SIZE = 64
+
+def format_csv_row(row):
+    """Format a single row as a line of CSV text"""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerow(row)
+    return buffer.getvalue()
+
+def write_page_csvs(pages, header_line):
+    """Write a batch of (output_file, row) pages, each to its own CSV file"""
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+    for output_file, row in pages:
+        # Build the whole file in memory and write it with a single syscall
+        data = memoryview((header_line + format_csv_row(row)).encode('utf-8'))
+        fd = os.open(output_file, flags, 0o666)
+        try:
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
+
+def read_csv_chunks(input_file, chunksize):
+    """Yield DataFrames of about chunksize rows using Arrow's threaded CSV reader"""
+    # Read every column as text so a column's type can't change between blocks
+    with open(input_file, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f), [])
+    
+    read_options = pacsv.ReadOptions(use_threads=True, block_size=8 << 20)
+    # Scraped titles and descriptions can contain newlines inside quoted values,
+    # so blocks must not be split on raw newlines
+    parse_options = pacsv.ParseOptions(newlines_in_values=True)
+    convert_options = pacsv.ConvertOptions(
+        column_types={name: pa.string() for name in header},
+        strings_can_be_null=True
+    )
+    
+    batches = []
+    num_rows = 0
+    num_chunks = 0
+    with pacsv.open_csv(
+        input_file, read_options=read_options, parse_options=parse_options, convert_options=convert_options
+    ) as reader:
+        for batch in reader:
+            batches.append(batch)
+            num_rows += batch.num_rows
+            if num_rows >= chunksize:
+                yield pa.Table.from_batches(batches).to_pandas()
+                num_chunks += 1
+                batches = []
+                num_rows = 0
+        
+        # A header-only file still yields one empty chunk, so its columns are organized
+        if batches or not num_chunks:
+            yield pa.Table.from_batches(batches, schema=reader.schema).to_pandas()
+
+def merge_sorted_csvs(input_files, output_file):
+    """Merge CSV files that are each sorted by domain and path into one sorted CSV"""
+    # Page body text can easily exceed the csv module's default field limit
+    field_size_limit = csv.field_size_limit(2**31 - 1)
+    
+    try:
+        with ExitStack() as stack:
+            readers = [
+                csv.reader(stack.enter_context(open(f, newline='', encoding='utf-8')))
+                for f in input_files
+            ]
+            header = [next(reader) for reader in readers][0]
+            
+            # Every organized column is text
+            schema = pa.schema([(name, pa.string()) for name in header])
+            writer = stack.enter_context(pacsv.CSVWriter(output_file, schema, write_options=CSV_WRITE_OPTIONS))
+            
+            # Domain and path are always the first two organized columns
+            merged_rows = heapq.merge(*readers, key=lambda row: (row[0], row[1]))
+            while True:
+                rows = list(itertools.islice(merged_rows, MERGE_BATCH_SIZE))
+                if not rows:
+                    break
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(column, pa.string()) for column in zip(*rows)], schema=schema
+                ))
+    finally:
+        csv.field_size_limit(field_size_limit)
+
+def prepare_chunk(df):
+    """Clean, enrich and sort one chunk of the luxury data"""
+    # Clean column names (remove any leading/trailing whitespace)
+    df.columns = df.columns.str.strip()
+    
+    # Fill missing values with empty strings
+    df = df.fillna('')
+    
+    # Create a new column with cleaned domain and path for better organization
+    url_parts = df['url'].str.extract(URL_PARTS_PATTERN, expand=True)
+    df['domain'] = url_parts['domain'].fillna('')
+    df['path'] = url_parts['path'].fillna('')
+    
+    # Create a new column with a date in a cleaner format
+    if 'date_crawled' in df.columns:
+        # Parse with the scraper's timestamp format; dates that don't match keep the original
+        df['date_crawled_formatted'] = (
+            pd.to_datetime(df['date_crawled'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+            .dt.strftime('%Y-%m-%d')
+            .fillna(df['date_crawled'])
+        )
+    
+    # Sort the data by domain and then by path for better organization
+    return df.sort_values(['domain', 'path'])
+
 def organize_luxury_data(input_file='luxury_data.csv', 
                          output_directory='organized_data',
                          create_individual_files=True,
-                         organize_main_csv=True):
+                         organize_main_csv=True,
+                         chunksize=200_000):
     """
     Organizes the luxury data CSV into a well-structured format
     
@@ -31,75 +174,94 @@ def organize_luxury_data(input_file='luxury_data.csv',
         output_directory: Directory to save organized files
         create_individual_files: Whether to create individual CSVs for each page
         organize_main_csv: Whether to create a single organized CSV with all data
+        chunksize: Number of rows to read and process at a time
     """
     # Create output directory if it doesn't exist
     if not os.path.exists(output_directory):
         os.makedirs(output_directory)
     
     try:
-        # Read the CSV file
-        df = pd.read_csv(input_file)
-        
-        # Clean column names (remove any leading/trailing whitespace)
-        df.columns = df.columns.str.strip()
-        
-        # Fill missing values with empty strings
-        df = df.fillna('')
-        
-        # Create a new column with cleaned domain and path for better organization
-        df['domain'] = df['url'].apply(lambda x: urlparse(x).netloc)
-        df['path'] = df['url'].apply(lambda x: urlparse(x).path)
+        main_csv = os.path.join(output_directory, 'organized_luxury_data.csv')
+        pages_dir = os.path.join(output_directory, 'pages')
         
-        # Create a new column with a date in a cleaner format
-        if 'date_crawled' in df.columns:
-            try:
-                df['date_crawled_formatted'] = pd.to_datetime(df['date_crawled']).dt.strftime('%Y-%m-%d')
-            except:
-                # If date conversion fails, keep the original
-                df['date_crawled_formatted'] = df['date_crawled']
+        # Create a folder for individual pages
+        if create_individual_files and not os.path.exists(pages_dir):
+            os.makedirs(pages_dir)
         
-        # Sort the data by domain and then by path for better organization
-        df = df.sort_values(['domain', 'path'])
-        
-        # Create a single organized CSV with all data
-        if organize_main_csv:
-            # Reorder columns for better organization
-            ordered_columns = [
-                'domain', 'path', 'url', 'title', 'meta_description', 
-                'h1', 'h2', 'h3_plus', 'body_text', 
-                'date_crawled', 'date_crawled_formatted', 'errors'
-            ]
-            
-            # Only include columns that exist in the dataframe
-            ordered_columns = [col for col in ordered_columns if col in df.columns]
+        with ExitStack() as stack:
+            # Sorted runs of the main CSV, merged once every chunk has been read
+            runs_dir = stack.enter_context(tempfile.TemporaryDirectory(dir=output_directory))
+            run_files = []
             
-            # Add any remaining columns that weren't in our predefined order
-            for col in df.columns:
-                if col not in ordered_columns:
-                    ordered_columns.append(col)
+            # The page writes are independent and I/O-bound, so fan them out over threads
+            max_workers = min(32, (os.cpu_count() or 1) * 4)
+            executor = stack.enter_context(ThreadPoolExecutor(max_workers=max_workers))
             
-            # Save the organized CSV
-            df[ordered_columns].to_csv(os.path.join(output_directory, 'organized_luxury_data.csv'), index=False)
-            print(f"Created organized CSV: {os.path.join(output_directory, 'organized_luxury_data.csv')}")
-        
-        # Create individual CSVs for each page
-        if create_individual_files:
-            # Create a folder for individual pages
-            pages_dir = os.path.join(output_directory, 'pages')
-            if not os.path.exists(pages_dir):
-                os.makedirs(pages_dir)
+            ordered_columns = None
+            total_rows = 0
             
-            # Process each row and create a separate CSV
-            for idx, row in df.iterrows():
-                # Create a clean filename from the URL
-                filename = clean_filename(row['url'])
+            # Read the CSV file in chunks so memory stays bounded by the chunk size
+            for chunk in read_csv_chunks(input_file, chunksize):
+                df = prepare_chunk(chunk)
+                total_rows += len(df)
                 
-                # Save the individual page data
-                row_df = pd.DataFrame([row])
-                output_file = os.path.join(pages_dir, f"{filename}.csv")
-                row_df.to_csv(output_file, index=False)
+                if ordered_columns is None:
+                    # Reorder columns for better organization
+                    ordered_columns = [
+                        'domain', 'path', 'url', 'title', 'meta_description', 
+                        'h1', 'h2', 'h3_plus', 'body_text', 
+                        'date_crawled', 'date_crawled_formatted', 'errors'
+                    ]
+                    
+                    # Only include columns that exist in the dataframe
+                    ordered_columns = [col for col in ordered_columns if col in df.columns]
+                    
+                    # Add any remaining columns that weren't in our predefined order
+                    for col in df.columns:
+                        if col not in ordered_columns:
+                            ordered_columns.append(col)
+                
+                # Save this chunk as a sorted run of the organized CSV
+                if organize_main_csv:
+                    run_file = os.path.join(runs_dir, f"run_{len(run_files)}.csv")
+                    table = pa.Table.from_pandas(df[ordered_columns], preserve_index=False)
+                    pacsv.write_csv(table, run_file, write_options=CSV_WRITE_OPTIONS)
+                    run_files.append(run_file)
+                
+                # Create individual CSVs for each page in this chunk
+                if create_individual_files:
+                    # Compute all filenames up front instead of once per row
+                    filenames = clean_filenames(df['domain'], df['path']).values
+                    
+                    # Write each row straight from the column arrays, skipping the
+                    # cost of building a one-row DataFrame per page
+                    rows = df[ordered_columns].itertuples(index=False, name=None)
+                    
+                    # Pages that map to the same filename keep the last row, as before,
+                    # and never race each other for the same file
+                    page_rows = {
+                        os.path.join(pages_dir, f"{filename}.csv"): row
+                        for filename, row in zip(filenames, rows)
+                    }
+                    
+                    # Hand the pages to the threads in batches to amortize task overhead
+                    pages = list(page_rows.items())
+                    header_line = format_csv_row(ordered_columns)
+                    list(executor.map(
+                        lambda batch: write_page_csvs(batch, header_line),
+                        (pages[i:i + PAGE_BATCH_SIZE] for i in range(0, len(pages), PAGE_BATCH_SIZE))
+                    ))
             
-            print(f"Created {len(df)} individual page CSVs in {pages_dir}")
+            # Create a single organized CSV with all data
+            if organize_main_csv and run_files:
+                if len(run_files) == 1:
+                    os.replace(run_files[0], main_csv)
+                else:
+                    merge_sorted_csvs(run_files, main_csv)
+                print(f"Created organized CSV: {main_csv}")
+        
+        if create_individual_files:
+            print(f"Created {total_rows} individual page CSVs in {pages_dir}")
         
         return True
     
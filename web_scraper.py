@@ -8,22 +8,31 @@ Date: April 27, 2025
 """
 
 import os
-import csv
+import re
+import json
 import time
 import logging
+import sqlite3
+import tempfile
+import threading
 import argparse
+import functools
 import urllib.parse
 from datetime import datetime
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from urllib.robotparser import RobotFileParser
 
-import requests
+import httpx
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from bs4 import BeautifulSoup
-import validators
-from urllib3.util import Retry
-from requests.adapters import HTTPAdapter
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 
 
 # Configure logging
@@ -37,6 +46,277 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# httpx logs every request at INFO; keep it quiet like requests/urllib3 were
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+# Absolute http(s) URL: host, optional port, then anything without whitespace
+URL_PATTERN = re.compile(r'^https?://[A-Za-z0-9._~%\-]+(?::\d+)?(?:[/?#]\S*)?$')
+
+# Server errors that are retried with exponential backoff
+RETRY_STATUS_CODES = {500, 502, 503, 504}
+
+# Runs of whitespace, collapsed to a single space in extracted body text
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def cached_urlparse(url):
+    """
+    Parse a URL, reusing the result for URLs seen before.
+    
+    Pages link to the same navigation URLs over and over, so most lookups hit the cache.
+    
+    Args:
+        url (str): URL to parse
+        
+    Returns:
+        urllib.parse.ParseResult: Parsed URL
+    """
+    return urllib.parse.urlparse(url)
+
+
+# robots.txt parsers shared by all crawlers, keyed by (scheme, host), least recently used first
+ROBOTS_CACHE = OrderedDict()
+ROBOTS_CACHE_SIZE = 1024
+ROBOTS_TTL = 6 * 3600  # seconds
+robots_cache_lock = threading.Lock()
+robots_fetch_locks = {}  # (scheme, host) -> lock held while that host's robots.txt is fetched
+
+
+def cached_robots_parser(key):
+    """
+    Look up a fresh robots.txt parser in the cache. Must be called with robots_cache_lock held.
+    
+    Args:
+        key (tuple): (scheme, host) to look up
+        
+    Returns:
+        RobotFileParser: Cached parser, or None if missing or older than ROBOTS_TTL
+    """
+    entry = ROBOTS_CACHE.get(key)
+    if entry and time.time() - entry[1] < ROBOTS_TTL:
+        ROBOTS_CACHE.move_to_end(key)
+        return entry[0]
+    return None
+
+
+def fetch_robots_parser(client, robots_url):
+    """
+    Download and parse a robots.txt file, following the rules of RobotFileParser.read().
+    
+    Args:
+        client (httpx.Client): Client to fetch with, carrying the crawler's headers and timeout
+        robots_url (str): URL of the robots.txt file
+        
+    Returns:
+        RobotFileParser: Parsed robots.txt rules
+    """
+    robots_parser = RobotFileParser(robots_url)
+    try:
+        response = client.get(robots_url)
+    except httpx.HTTPError as e:
+        # Treat an unreachable robots.txt as having no restrictions
+        logger.warning(f"Could not fetch robots.txt at {robots_url}: {e}")
+        robots_parser.allow_all = True
+        return robots_parser
+    
+    if response.status_code in (401, 403):
+        robots_parser.disallow_all = True
+    elif 400 <= response.status_code < 500:
+        robots_parser.allow_all = True
+    elif response.status_code >= 500:
+        logger.warning(f"Server error {response.status_code} fetching robots.txt at {robots_url}, not crawling its host")
+        robots_parser.disallow_all = True
+    else:
+        robots_parser.parse(response.text.splitlines())
+        logger.info(f"Successfully parsed robots.txt at {robots_url}")
+    return robots_parser
+
+
+def get_robots_parser(client, scheme, host):
+    """
+    Get the robots.txt parser for a host, fetching it at most once per ROBOTS_TTL.
+    
+    Args:
+        client (httpx.Client): Client to fetch robots.txt with
+        scheme (str): URL scheme of the host
+        host (str): Host (netloc) to get robots.txt rules for
+        
+    Returns:
+        RobotFileParser: Parsed robots.txt rules for the host
+    """
+    key = (scheme, host)
+    with robots_cache_lock:
+        robots_parser = cached_robots_parser(key)
+        if robots_parser:
+            return robots_parser
+        fetch_lock = robots_fetch_locks.setdefault(key, threading.Lock())
+    
+    # Fetch outside the cache lock, so a slow host only holds up requests to that host
+    with fetch_lock:
+        with robots_cache_lock:
+            robots_parser = cached_robots_parser(key)
+            if robots_parser:
+                return robots_parser
+        
+        robots_parser = fetch_robots_parser(client, f"{scheme}://{host}/robots.txt")
+        
+        with robots_cache_lock:
+            ROBOTS_CACHE[key] = (robots_parser, time.time())
+            ROBOTS_CACHE.move_to_end(key)
+            if len(ROBOTS_CACHE) > ROBOTS_CACHE_SIZE:
+                ROBOTS_CACHE.popitem(last=False)
+            robots_fetch_locks.pop(key, None)
+    return robots_parser
+
+
+class CrawlState:
+    """
+    Visited URLs, the crawl frontier and extracted pages, kept in SQLite rather than in memory.
+    
+    Changes are committed once per completed depth, so a crawl stored in a file
+    can be resumed from the last completed depth after it is interrupted, with
+    the pages extracted before the interruption still exported.
+    """
+    
+    def __init__(self, path=None):
+        """
+        Open (or create) the crawl state database.
+        
+        Args:
+            path (str): SQLite database file to keep, or None for a temporary one
+                that is deleted when the state is closed
+        """
+        # Even a throwaway crawl is kept on disk, so memory stays bounded
+        self.temp_dir = None
+        if path is None:
+            self.temp_dir = tempfile.TemporaryDirectory(prefix='crawl_state_')
+            path = os.path.join(self.temp_dir.name, 'crawl_state.db')
+        
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS visited (url TEXT PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS frontier (url TEXT PRIMARY KEY, depth INTEGER NOT NULL);
+            CREATE INDEX IF NOT EXISTS frontier_depth ON frontier (depth);
+            CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, data TEXT NOT NULL);
+        """)
+        self.visited_count = self.db.execute("SELECT COUNT(*) FROM visited").fetchone()[0]
+    
+    def is_visited(self, url):
+        """Check whether a URL has already been visited."""
+        return self.db.execute("SELECT 1 FROM visited WHERE url = ?", (url,)).fetchone() is not None
+    
+    def mark_visited(self, url):
+        """Record a URL as visited."""
+        cursor = self.db.execute("INSERT OR IGNORE INTO visited (url) VALUES (?)", (url,))
+        self.visited_count += cursor.rowcount
+    
+    def is_queued(self, url):
+        """Check whether a URL is waiting in the frontier."""
+        return self.db.execute("SELECT 1 FROM frontier WHERE url = ?", (url,)).fetchone() is not None
+    
+    def is_known(self, url):
+        """Check whether a URL has been visited or is waiting in the frontier, in one query."""
+        return self.db.execute(
+            "SELECT EXISTS (SELECT 1 FROM visited WHERE url = ?) OR EXISTS (SELECT 1 FROM frontier WHERE url = ?)",
+            (url, url)
+        ).fetchone()[0] == 1
+    
+    def add_to_frontier(self, urls, depth):
+        """
+        Queue URLs to be visited at a given depth, ignoring any already queued.
+        
+        Args:
+            urls (list): URLs to queue
+            depth (int): Crawl depth the URLs were found for
+        """
+        self.db.executemany(
+            "INSERT OR IGNORE INTO frontier (url, depth) VALUES (?, ?)",
+            ((url, depth) for url in urls)
+        )
+    
+    def pop_frontier(self, depth, shuffle=False):
+        """
+        Remove and return every URL queued for a given depth.
+        
+        Args:
+            depth (int): Crawl depth to take URLs for
+            shuffle (bool): Return the URLs in random order instead of the order they were queued
+            
+        Returns:
+            list: URLs queued for the depth
+        """
+        order = "RANDOM()" if shuffle else "rowid"
+        urls = [row[0] for row in self.db.execute(
+            f"SELECT url FROM frontier WHERE depth = ? ORDER BY {order}", (depth,)
+        )]
+        self.db.execute("DELETE FROM frontier WHERE depth = ?", (depth,))
+        return urls
+    
+    def trim_frontier(self, depth, max_size, shuffle=False):
+        """
+        Limit the number of URLs queued for a given depth.
+        
+        Args:
+            depth (int): Crawl depth to limit
+            max_size (int): Maximum number of URLs to keep
+            shuffle (bool): Keep a random sample instead of the earliest queued URLs
+        """
+        order = "RANDOM()" if shuffle else "rowid"
+        self.db.execute(
+            f"""DELETE FROM frontier WHERE depth = ? AND rowid NOT IN (
+                SELECT rowid FROM frontier WHERE depth = ? ORDER BY {order} LIMIT ?
+            )""",
+            (depth, depth, max_size)
+        )
+    
+    def frontier_size(self):
+        """Count the URLs waiting in the frontier."""
+        return self.db.execute("SELECT COUNT(*) FROM frontier").fetchone()[0]
+    
+    def frontier_depth(self):
+        """Return the shallowest depth with queued URLs, or None if the frontier is empty."""
+        return self.db.execute("SELECT MIN(depth) FROM frontier").fetchone()[0]
+    
+    def add_page(self, page_data):
+        """
+        Store the data extracted from a page.
+        
+        Args:
+            page_data (dict): Extracted text elements, as returned by extract_text_elements
+        """
+        self.db.execute(
+            "INSERT OR REPLACE INTO pages (url, data) VALUES (?, ?)",
+            (page_data['url'], json.dumps(page_data))
+        )
+    
+    def pages(self):
+        """
+        Iterate over the stored pages in the order they were extracted.
+        
+        Returns:
+            iterator: Extracted text elements for each page
+        """
+        for (data,) in self.db.execute("SELECT data FROM pages ORDER BY rowid"):
+            yield json.loads(data)
+    
+    def page_count(self):
+        """Count the extracted pages."""
+        return self.db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+    
+    def commit(self):
+        """Persist all changes made since the last commit."""
+        self.db.commit()
+    
+    def close(self):
+        """Commit any outstanding changes and close the database, deleting it if temporary."""
+        self.db.commit()
+        self.db.close()
+        if self.temp_dir:
+            self.temp_dir.cleanup()
+
 
 class WebCrawler:
     """
@@ -51,40 +331,76 @@ class WebCrawler:
             config (dict): Configuration parameters for the crawler
         """
         self.config = config
-        self.visited_urls = set()
-        self.urls_to_visit = [config['start_url']]
-        self.current_depth = 0
-        self.data = []
-        self.domain = urllib.parse.urlparse(config['start_url']).netloc
-        
-        # Set up requests session with retries and timeouts
-        self.session = requests.Session()
-        retries = Retry(
-            total=config.get('max_retries', 3),
-            backoff_factor=config.get('backoff_factor', 0.3),
-            status_forcelist=[500, 502, 503, 504]
+        
+        # Visited URLs and the frontier, resumed from a previous run if state_db has one
+        self.state = CrawlState(config.get('state_db'))
+        self.current_depth = self.state.frontier_depth()
+        if self.current_depth is None:
+            self.current_depth = 0
+            if not self.state.visited_count:
+                self.state.add_to_frontier([config['start_url']], 0)
+                self.state.commit()
+        else:
+            logger.info(f"Resuming crawl at depth {self.current_depth} with {self.state.visited_count} pages already visited")
+        
+        self.domain = cached_urlparse(config['start_url']).netloc
+        self.ignore_extensions = tuple(
+            ext.lower() for ext in config.get('ignore_extensions', ['.pdf', '.jpg', '.png', '.gif', '.css', '.js'])
         )
-        self.session.mount('http://', HTTPAdapter(max_retries=retries))
-        self.session.mount('https://', HTTPAdapter(max_retries=retries))
+        # Content selectors in priority order, plus all of them combined so the
+        # candidates for the main content are found in a single tree walk
+        self.content_selectors = config.get('content_selectors', ['main', 'article', '#content', '.content'])
+        self.content_selector = ', '.join(self.content_selectors)
         
-        # Set up robotparser
-        self.robots_parser = RobotFileParser()
-        robots_url = urllib.parse.urljoin(config['start_url'], '/robots.txt')
-        self.robots_parser.set_url(robots_url)
-        try:
-            self.robots_parser.read()
-            logger.info(f"Successfully parsed robots.txt at {robots_url}")
-        except Exception as e:
-            logger.warning(f"Could not parse robots.txt: {e}")
+        self.use_selenium = config.get('use_selenium', False)
+        self.open_connections()
+        
+        # Shared rate limiting so concurrent workers still space out their requests
+        self.rate_limit_lock = threading.Lock()
+        self.next_request_time = 0.0
+    
+    def open_connections(self):
+        """
+        Set up the HTTP client, the Selenium driver if used, and the fetch worker pool.
+        """
+        # Set up an HTTP/2 client with retries and timeouts; concurrent fetches
+        # to the same host are multiplexed over a single connection
+        self.client = httpx.Client(
+            transport=httpx.HTTPTransport(http2=True, retries=self.config.get('max_retries', 3)),
+            timeout=self.config.get('request_timeout', 10),
+            headers=self.config.get('headers', {'User-Agent': 'Custom Web Crawler Bot 1.0'}),
+            follow_redirects=True
+        )
         
         # Set up selenium for JavaScript-rendered content if needed
-        self.use_selenium = config.get('use_selenium', False)
         if self.use_selenium:
             chrome_options = Options()
             chrome_options.add_argument("--headless")
             chrome_options.add_argument("--disable-gpu")
             chrome_options.add_argument("--no-sandbox")
+            # Only the text is scraped, so skip downloading images and stylesheets
+            chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+            chrome_options.add_experimental_option("prefs", {
+                "profile.managed_default_content_settings.images": 2,
+                "profile.default_content_setting_values.stylesheet": 2
+            })
+            # Return from get() once the DOM is ready instead of waiting for every resource
+            chrome_options.page_load_strategy = 'eager'
             self.driver = webdriver.Chrome(options=chrome_options)
+        
+        # Fetch pages concurrently; a single Selenium driver can only load one page at a time
+        max_workers = 1 if self.use_selenium else self.config.get('concurrency', 16)
+        self.fetch_pool = ThreadPoolExecutor(max_workers=max_workers)
+    
+    def close_connections(self):
+        """
+        Shut down the fetch worker pool, the HTTP client and the Selenium driver if used.
+        """
+        self.fetch_pool.shutdown()
+        self.fetch_pool = None
+        self.client.close()
+        if self.use_selenium:
+            self.driver.quit()
     
     def can_fetch(self, url):
         """
@@ -96,10 +412,17 @@ class WebCrawler:
         Returns:
             bool: True if the URL can be fetched, False otherwise
         """
-        # For educational purposes only, we're bypassing the robots.txt check
-        # In a production environment, you should always respect robots.txt
-        logger.info("Note: Bypassing robots.txt check for educational purposes")
-        return True
+        if not self.config.get('respect_robots', False):
+            # For educational purposes only, we're bypassing the robots.txt check
+            # In a production environment, you should always respect robots.txt
+            logger.info("Note: Bypassing robots.txt check for educational purposes")
+            return True
+        
+        # robots.txt is fetched lazily and shared across pages on the same host
+        parsed_url = cached_urlparse(url)
+        robots_parser = get_robots_parser(self.client, parsed_url.scheme, parsed_url.netloc)
+        user_agent = self.config.get('headers', {}).get('User-Agent', '*')
+        return robots_parser.can_fetch(user_agent, url)
     
     def is_valid_url(self, url):
         """
@@ -111,26 +434,78 @@ class WebCrawler:
         Returns:
             bool: True if the URL is valid, False otherwise
         """
-        if not validators.url(url):
+        if not URL_PATTERN.match(url):
             return False
         
-        parsed_url = urllib.parse.urlparse(url)
-        
         # Check if URL is within allowed domains
         if self.config.get('restrict_to_domain', True):
-            if parsed_url.netloc != self.domain:
+            if cached_urlparse(url).netloc != self.domain:
                 return False
         
         # Skip URLs with file extensions we want to ignore
-        ignore_extensions = self.config.get('ignore_extensions', ['.pdf', '.jpg', '.png', '.gif', '.css', '.js'])
-        if any(url.lower().endswith(ext) for ext in ignore_extensions):
+        if url.lower().endswith(self.ignore_extensions):
             return False
             
         return True
     
+    def wait_for_rate_limit(self):
+        """
+        Block until this worker may send its next request.
+        
+        Requests across all workers are spaced at least request_delay seconds apart.
+        """
+        with self.rate_limit_lock:
+            now = time.monotonic()
+            request_time = max(now, self.next_request_time)
+            self.next_request_time = request_time + self.config.get('request_delay', 1)
+        time.sleep(request_time - now)
+    
+    def send_request(self, url):
+        """
+        Send a GET request, retrying server errors with exponential backoff.
+        
+        Connection failures are retried by the client's transport.
+        
+        Args:
+            url (str): URL to request
+            
+        Returns:
+            httpx.Response: The final response received, streamed with its body not yet read
+        """
+        max_retries = self.config.get('max_retries', 3)
+        for attempt in range(max_retries + 1):
+            response = self.client.send(self.client.build_request('GET', url), stream=True)
+            if response.status_code not in RETRY_STATUS_CODES or attempt == max_retries:
+                return response
+            response.close()
+            time.sleep(self.config.get('backoff_factor', 0.3) * (2 ** attempt))
+    
+    def read_page_body(self, response):
+        """
+        Read the body of a streamed response, up to max_page_bytes if configured.
+        
+        Args:
+            response (httpx.Response): Streamed response to read
+            
+        Returns:
+            str: Decoded body of the response
+        """
+        max_page_bytes = self.config.get('max_page_bytes')
+        if max_page_bytes is None:
+            response.read()
+            return response.text
+        
+        body = bytearray()
+        for chunk in response.iter_bytes():
+            body += chunk
+            if len(body) >= max_page_bytes:
+                logger.warning(f"Truncating {response.url} at {max_page_bytes} bytes")
+                break
+        return bytes(body[:max_page_bytes]).decode(response.encoding or 'utf-8', errors='replace')
+    
     def get_page_content(self, url):
         """
-        Fetch the content of a web page using requests or selenium.
+        Fetch the content of a web page using httpx or selenium.
         
         Args:
             url (str): URL to fetch
@@ -143,23 +518,39 @@ class WebCrawler:
                 logger.warning(f"Robots.txt disallows fetching {url}")
                 return None
                 
+            # Respect rate limiting
+            self.wait_for_rate_limit()
+            
             logger.info(f"Fetching: {url}")
             
             if self.use_selenium:
                 self.driver.get(url)
-                time.sleep(self.config.get('selenium_wait', 2))  # Wait for JavaScript to load
+                # The eager load strategy returns as soon as the DOM is parsed, so wait for
+                # JavaScript to render the main content, up to selenium_wait seconds
+                if self.content_selector:
+                    content_rendered = EC.presence_of_element_located((By.CSS_SELECTOR, self.content_selector))
+                else:
+                    content_rendered = lambda driver: driver.execute_script('return document.readyState') == 'complete'
+                try:
+                    WebDriverWait(self.driver, self.config.get('selenium_wait', 2)).until(content_rendered)
+                except TimeoutException:
+                    logger.info(f"No main content rendered on {url} within the wait, using the page as is")
                 html_content = self.driver.page_source
             else:
-                response = self.session.get(
-                    url, 
-                    timeout=self.config.get('request_timeout', 10),
-                    headers=self.config.get('headers', {'User-Agent': 'Custom Web Crawler Bot 1.0'})
-                )
-                response.raise_for_status()
-                html_content = response.text
+                response = self.send_request(url)
+                try:
+                    response.raise_for_status()
+                    
+                    # Skip binary content served without a telltale extension before downloading it
+                    content_type = response.headers.get('Content-Type', '')
+                    if content_type and 'html' not in content_type.lower():
+                        logger.info(f"Skipping non-HTML content ({content_type}) at {url}")
+                        return None
+                    
+                    html_content = self.read_page_body(response)
+                finally:
+                    response.close()
                 
-            # Respect rate limiting
-            time.sleep(self.config.get('request_delay', 1))
             return html_content
             
         except Exception as e:
@@ -189,8 +580,7 @@ class WebCrawler:
                 
             # Check if the URL is valid and not already visited
             if (self.is_valid_url(absolute_url) and 
-                absolute_url not in self.visited_urls and 
-                absolute_url not in self.urls_to_visit):
+                not self.state.is_known(absolute_url)):
                 links.append(absolute_url)
                 
         return links
@@ -219,52 +609,55 @@ class WebCrawler:
         }
         
         try:
+            # Collect title, meta and heading tags in a single walk of the tree
+            tags_by_name = defaultdict(list)
+            for tag in soup.find_all(['title', 'meta', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
+                tags_by_name[tag.name].append(tag)
+            
             # Extract title
-            title_tag = soup.find('title')
-            if title_tag:
-                page_data['title'] = title_tag.get_text(strip=True)
+            if tags_by_name['title']:
+                page_data['title'] = tags_by_name['title'][0].get_text(strip=True)
             
             # Extract meta description
-            meta_desc = soup.find('meta', attrs={'name': 'description'})
-            if meta_desc and 'content' in meta_desc.attrs:
-                page_data['meta_description'] = meta_desc['content']
+            for meta in tags_by_name['meta']:
+                if meta.get('name') == 'description':
+                    if 'content' in meta.attrs:
+                        page_data['meta_description'] = meta['content']
+                    break
             
             # Extract headings
-            if soup.find('h1'):
-                page_data['h1'] = [h.get_text(strip=True) for h in soup.find_all('h1')]
-            
-            if soup.find('h2'):
-                page_data['h2'] = [h.get_text(strip=True) for h in soup.find_all('h2')]
+            page_data['h1'] = [h.get_text(strip=True) for h in tags_by_name['h1']]
+            page_data['h2'] = [h.get_text(strip=True) for h in tags_by_name['h2']]
             
             # Extract h3 and beyond
             h3_plus = []
             for i in range(3, 7):  # h3 to h6
                 tag = f'h{i}'
-                if soup.find(tag):
-                    for h in soup.find_all(tag):
-                        text = h.get_text(strip=True)
-                        h3_plus.append(f"{tag}: {text}")
+                for h in tags_by_name[tag]:
+                    text = h.get_text(strip=True)
+                    h3_plus.append(f"{tag}: {text}")
             page_data['h3_plus'] = h3_plus
             
             # Extract main body text
-            # Remove navigation, header, footer, script, style tags
-            for tag in soup(['nav', 'header', 'footer', 'script', 'style', 'iframe']):
-                tag.decompose()
+            # Remove navigation, header, footer, script, style tags; detaching them is
+            # enough since the page is discarded afterwards, so skip decompose()'s teardown
+            for tag in soup.find_all(['nav', 'header', 'footer', 'script', 'style', 'iframe']):
+                tag.extract()
                 
-            # Get the main content area if specified
+            # Get the main content area if specified, or use body if none is found
             main_content = None
-            content_selectors = self.config.get('content_selectors', ['main', 'article', '#content', '.content'])
-            for selector in content_selectors:
-                main_content = soup.select_one(selector)
-                if main_content:
-                    break
-            
-            # If no main content area found, use body
+            if self.content_selector:
+                # Earlier selectors win over later ones, whatever their position in the page
+                candidates = soup.select(self.content_selector)
+                for selector in self.content_selectors:
+                    main_content = next((tag for tag in candidates if tag.css.match(selector)), None)
+                    if main_content:
+                        break
             if not main_content:
                 main_content = soup.body
                 
             if main_content:
-                page_data['body_text'] = ' '.join(main_content.get_text(separator=' ', strip=True).split())
+                page_data['body_text'] = WHITESPACE_PATTERN.sub(' ', main_content.get_text(separator=' ', strip=True)).strip()
             
         except Exception as e:
             error_msg = f"Error extracting content: {e}"
@@ -279,58 +672,64 @@ class WebCrawler:
         """
         logger.info(f"Starting crawl from {self.config['start_url']} with max depth {self.config.get('max_depth', 3)}")
         
-        while self.urls_to_visit and self.current_depth <= self.config.get('max_depth', 3):
-            # Get URLs for current depth
-            urls_at_current_depth = self.urls_to_visit.copy()
-            self.urls_to_visit = []
-            
-            for url in urls_at_current_depth:
-                # Skip if already visited
-                if url in self.visited_urls:
-                    continue
+        shuffle = not self.config.get('breadth_first', True)
+        
+        # Reopen the connections if a previous crawl closed them
+        if self.fetch_pool is None:
+            self.open_connections()
+        
+        try:
+            while self.current_depth <= self.config.get('max_depth', 3):
+                # Take the URLs for the current depth off the frontier, shuffled if
+                # breadth-first is not specified
+                urls_to_visit = self.state.pop_frontier(self.current_depth, shuffle=shuffle)
+                if not urls_to_visit:
+                    break
+                
+                urls_at_current_depth = []
+                for url in urls_to_visit:
+                    # Skip if already visited
+                    if self.state.is_visited(url):
+                        continue
                     
-                self.visited_urls.add(url)
+                    self.state.mark_visited(url)
                 
-                # Check if we've reached the maximum number of pages
-                if len(self.visited_urls) >= self.config.get('max_pages', float('inf')):
-                    logger.info(f"Reached maximum number of pages ({self.config.get('max_pages')})")
-                    break
+                    # Check if we've reached the maximum number of pages
+                    if self.state.visited_count >= self.config.get('max_pages', float('inf')):
+                        logger.info(f"Reached maximum number of pages ({self.config.get('max_pages')})")
+                        break
                 
-                # Fetch and process the page
-                html_content = self.get_page_content(url)
-                if not html_content:
-                    continue
+                    urls_at_current_depth.append(url)
                 
-                soup = BeautifulSoup(html_content, 'html.parser')
+                # Fetch the pages concurrently, processing them in crawl order
+                pages = self.fetch_pool.map(self.get_page_content, urls_at_current_depth)
+                for url, html_content in zip(urls_at_current_depth, pages):
+                    if not html_content:
+                        continue
                 
-                # Extract and store text data
-                page_data = self.extract_text_elements(soup, url)
-                self.data.append(page_data)
+                    soup = BeautifulSoup(html_content, 'lxml')
                 
-                # Extract links for the next depth
-                if self.current_depth < self.config.get('max_depth', 3):
-                    extracted_links = self.extract_links(soup, url)
-                    self.urls_to_visit.extend(extracted_links)
-                    
-            # Move to next depth
-            self.current_depth += 1
-            logger.info(f"Completed depth {self.current_depth}. Visited {len(self.visited_urls)} pages. Found {len(self.urls_to_visit)} new URLs.")
-            
-            # Shuffle URLs if breadth-first is not specified
-            if not self.config.get('breadth_first', True):
-                import random
-                random.shuffle(self.urls_to_visit)
+                    # Extract and store text data
+                    page_data = self.extract_text_elements(soup, url)
+                    self.state.add_page(page_data)
                 
-            # Limit the queue size
-            max_queue = self.config.get('max_queue_size', 1000)
-            if len(self.urls_to_visit) > max_queue:
-                self.urls_to_visit = self.urls_to_visit[:max_queue]
+                    # Extract links for the next depth
+                    if self.current_depth < self.config.get('max_depth', 3):
+                        extracted_links = self.extract_links(soup, url)
+                        self.state.add_to_frontier(extracted_links, self.current_depth + 1)
+                    
+                # Move to next depth
+                self.current_depth += 1
                 
-        # Clean up if selenium was used
-        if self.use_selenium:
-            self.driver.quit()
+                # Limit the queue size
+                self.state.trim_frontier(self.current_depth, self.config.get('max_queue_size', 1000), shuffle=shuffle)
+                self.state.commit()
+                logger.info(f"Completed depth {self.current_depth}. Visited {self.state.visited_count} pages. Found {self.state.frontier_size()} new URLs.")
+        finally:
+            # Always release the worker pool, HTTP client and any Chrome process
+            self.close_connections()
             
-        logger.info(f"Crawl complete. Visited {len(self.visited_urls)} pages. Extracted data from {len(self.data)} pages.")
+        logger.info(f"Crawl complete. Visited {self.state.visited_count} pages. Extracted data from {self.state.page_count()} pages.")
         
     def export_to_csv(self, filename='crawled_data.csv'):
         """
@@ -339,22 +738,19 @@ class WebCrawler:
         Args:
             filename (str): Name of the CSV file to create
         """
-        if not self.data:
+        if not self.state.page_count():
             logger.warning("No data to export")
             return
             
         try:
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                # Convert lists to strings for CSV
-                for item in self.data:
-                    item['h1'] = ' | '.join(item['h1'])
-                    item['h2'] = ' | '.join(item['h2'])
-                    item['h3_plus'] = ' | '.join(item['h3_plus'])
-                
-                fieldnames = self.data[0].keys()
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(self.data)
+            # Gather the stored pages into columns, converting lists to strings for CSV
+            columns = defaultdict(list)
+            for page_data in self.state.pages():
+                for field, value in page_data.items():
+                    columns[field].append(' | '.join(value) if field in ('h1', 'h2', 'h3_plus') else value)
+            
+            table = pa.table(columns)
+            pacsv.write_csv(table, filename, write_options=pacsv.WriteOptions(quoting_style='needed'))
                 
             logger.info(f"Data exported to {filename}")
         except Exception as e:
@@ -375,10 +771,15 @@ def parse_arguments():
     parser.add_argument('--depth', '-d', type=int, default=3, help='Maximum crawl depth')
     parser.add_argument('--max-pages', '-m', type=int, default=100, help='Maximum number of pages to crawl')
     parser.add_argument('--delay', '-w', type=float, default=1.0, help='Delay between requests in seconds')
+    parser.add_argument('--concurrency', '-c', type=int, default=16, help='Number of pages to fetch concurrently')
     parser.add_argument('--no-domain-restrict', action='store_false', dest='restrict_domain', 
                         help='Do not restrict crawling to the starting domain')
     parser.add_argument('--selenium', action='store_true', help='Use Selenium for JavaScript rendering')
+    parser.add_argument('--respect-robots', action='store_true', help='Only fetch pages allowed by robots.txt')
     parser.add_argument('--breadth-first', action='store_true', help='Use breadth-first crawling strategy')
+    parser.add_argument('--state-db',
+                        help='SQLite file to keep crawl state and extracted pages in, so an interrupted crawl '
+                             'can be resumed (default: a temporary file deleted after export)')
     
     return parser.parse_args()
 
@@ -395,9 +796,12 @@ def main():
         'max_depth': args.depth,
         'max_pages': args.max_pages,
         'request_delay': args.delay,
+        'concurrency': args.concurrency,
         'restrict_to_domain': args.restrict_domain,
         'use_selenium': args.selenium,
+        'respect_robots': args.respect_robots,
         'breadth_first': args.breadth_first,
+        'state_db': args.state_db,
         'headers': {
             'User-Agent': 'Custom Web Crawler Bot 1.0 (https://example.com/bot)'
         },
@@ -410,6 +814,7 @@ def main():
     crawler = WebCrawler(config)
     crawler.crawl()
     crawler.export_to_csv(args.output)
+    crawler.state.close()
 
 
 if __name__ == "__main__":